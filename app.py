@@ -1,5 +1,4 @@
 import streamlit as st
-from streamlit_folium import st_folium
 import folium
 import matplotlib.pyplot as plt
 import time
@@ -23,6 +22,70 @@ if 'cost' not in st.session_state:
     st.session_state.cost = None
 if 'history' not in st.session_state:
     st.session_state.history = None
+if 'history_x' not in st.session_state:
+    st.session_state.history_x = None
+if 'iterations' not in st.session_state:
+    st.session_state.iterations = 0
+
+
+def history_iterations(opt, num_points, offset=0):
+    """Iteration numbers of sampled history points / Номери ітерацій для точок історії"""
+    x = [offset + k * opt.history_stride for k in range(num_points)]
+    if x:
+        # Last point is always the final iteration / Остання точка - завжди фінальна ітерація
+        x[-1] = offset + opt.last_iterations - 1
+    return x
+
+
+# Only the latest map per session is shown / Показується лише остання карта сесії
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_map_html(place_name, targets, route, _opt):
+    """
+    Builds the folium map once per (place, targets, route) and caches its HTML.
+    Будує карту folium один раз для (район, цілі, маршрут) і кешує її HTML.
+    """
+    opt = _opt
+
+    # Center map on Depot
+    depot_node = targets[0]
+    start_lat = opt.G.nodes[depot_node]['y']
+    start_lon = opt.G.nodes[depot_node]['x']
+    
+    m = folium.Map(location=[start_lat, start_lon], zoom_start=14)
+
+    # Draw Markers
+    markers = opt.get_markers()
+    for marker in markers:
+        if marker['type'] == 'depot':
+            folium.Marker(
+                [marker['lat'], marker['lon']],
+                popup="Depot",
+                icon=folium.Icon(color="green", icon="home")
+            ).add_to(m)
+        else:
+            folium.CircleMarker(
+                location=[marker['lat'], marker['lon']],
+                radius=6,
+                popup=f"Order #{marker['id']}",
+                color="blue",
+                fill=True,
+                fill_color="blue"
+            ).add_to(m)
+
+    # Draw Route Polyline
+    if route:
+        route_coords = opt.get_route_coordinates(list(route))
+        if route_coords:
+            folium.PolyLine(
+                locations=route_coords,
+                color="red",
+                weight=4,
+                opacity=0.8,
+                tooltip="Optimal Path"
+            ).add_to(m)
+
+    return m.get_root().render()
+
 
 # --- SIDEBAR / БІЧНА ПАНЕЛЬ ---
 st.sidebar.header("⚙️ Settings / Налаштування")
@@ -30,6 +93,7 @@ st.sidebar.header("⚙️ Settings / Налаштування")
 # Input for Place / Введення місця
 place_name = st.sidebar.text_input("Area / Район (OSM)", "Korabelnyi District, Kherson, Ukraine")
 num_orders = st.sidebar.slider("Orders Count / Кількість замовлень", 5, 30, 10)
+num_chains = st.sidebar.slider("SA Chains / Паралельні ланцюги", 1, 8, 4)
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Controls / Керування")
@@ -40,13 +104,15 @@ if st.sidebar.button("1. Load Map / Завантажити карту", use_cont
         try:
             # Call Backend
             opt = UrbanDeliveryOptimizer(place_name, num_orders)
-            opt.precalculate_distances()
+            opt.ensure_distances()
             
             # Save to session
             st.session_state.optimizer = opt
             st.session_state.route = None 
             st.session_state.cost = None
             st.session_state.history = None
+            st.session_state.history_x = None
+            st.session_state.iterations = 0
             
             st.success("✅ Map Loaded!")
         except Exception as e:
@@ -57,14 +123,18 @@ if st.sidebar.button("2. Optimize Route / Знайти маршрут", use_cont
     if st.session_state.optimizer:
         with st.spinner('Running Simulated Annealing...'):
             opt = st.session_state.optimizer
+            # No-op while targets are unchanged / Нічого не робить, поки цілі не змінилися
+            opt.ensure_distances()
             
             start_time = time.time() 
-            route, cost, hist = opt.simulated_annealing()
+            route, cost, hist = opt.simulated_annealing(num_chains=num_chains)
             exec_time = time.time() - start_time 
             
             st.session_state.route = route
             st.session_state.cost = cost
             st.session_state.history = hist
+            st.session_state.history_x = history_iterations(opt, len(hist))
+            st.session_state.iterations = opt.last_iterations
             st.sidebar.success(f"Час конвергенції: {exec_time:.3f} сек") # Виводимо час!
     else:
         st.warning("Please load the map first!")
@@ -83,13 +153,18 @@ if st.sidebar.button("3. ➕ Add Order / Додати замовлення", use
                 route, cost, hist = opt.simulated_annealing(
                     initial_route=current_route, 
                     initial_temp=200, 
-                    max_iter=1000
+                    max_iter=1000,
+                    num_chains=num_chains
                 )
                 exec_time = time.time() - start_time 
                 
                 st.session_state.route = route
                 st.session_state.cost = cost
                 st.session_state.history.extend(hist)
+                st.session_state.history_x.extend(
+                    history_iterations(opt, len(hist), offset=st.session_state.iterations)
+                )
+                st.session_state.iterations += opt.last_iterations
                 st.sidebar.success(f"Час адаптації (Hot Start): {exec_time:.3f} сек")
 
 # --- MAIN DASHBOARD / ГОЛОВНА ПАНЕЛЬ ---
@@ -124,7 +199,7 @@ if st.session_state.route and st.session_state.cost:
     )
     
     # 4. Час конвергенції (приблизна оцінка швидкодії)
-    total_iterations = len(st.session_state.history)
+    total_iterations = st.session_state.iterations
     m4.metric(
         label="⚡ Ітерацій до конвергенції", 
         value=f"{total_iterations}"
@@ -138,47 +213,11 @@ with col_map:
     st.subheader("🗺️ Live Map")
     if st.session_state.optimizer:
         opt = st.session_state.optimizer
-        
-        # Center map on Depot
-        depot_node = opt.targets[0]
-        start_lat = opt.G.nodes[depot_node]['y']
-        start_lon = opt.G.nodes[depot_node]['x']
-        
-        m = folium.Map(location=[start_lat, start_lon], zoom_start=14)
-
-        # Draw Markers
-        markers = opt.get_markers()
-        for marker in markers:
-            if marker['type'] == 'depot':
-                folium.Marker(
-                    [marker['lat'], marker['lon']],
-                    popup="Depot",
-                    icon=folium.Icon(color="green", icon="home")
-                ).add_to(m)
-            else:
-                folium.CircleMarker(
-                    location=[marker['lat'], marker['lon']],
-                    radius=6,
-                    popup=f"Order #{marker['id']}",
-                    color="blue",
-                    fill=True,
-                    fill_color="blue"
-                ).add_to(m)
-
-        # Draw Route Polyline
-        if st.session_state.route:
-            route_coords = opt.get_route_coordinates(st.session_state.route)
-            if route_coords:
-                folium.PolyLine(
-                    locations=route_coords,
-                    color="red",
-                    weight=4,
-                    opacity=0.8,
-                    tooltip="Optimal Path"
-                ).add_to(m)
+        route_key = tuple(st.session_state.route or ())
+        map_html = render_map_html(place_name, tuple(opt.targets), route_key, opt)
 
         # Render Map
-        st_folium(m, width=800, height=500, returned_objects=[])
+        st.iframe(map_html, width=800, height=500)
     else:
         st.info("👈 Use Sidebar to start.")
 
@@ -186,10 +225,11 @@ with col_graph:
     st.subheader("📈 Algorithm Convergence")
     if st.session_state.history:
         fig, ax = plt.subplots(figsize=(5, 4))
-        ax.plot(st.session_state.history, color='orange', linewidth=2)
+        ax.plot(st.session_state.history_x, st.session_state.history, color='orange', linewidth=2)
         ax.set_xlabel("Iterations")
         ax.set_ylabel("Cost (meters)")
         ax.grid(True, linestyle='--', alpha=0.6)
         st.pyplot(fig)
+        plt.close(fig)
     else:
         st.write("Graph will appear after calculation.")
\ No newline at end of file
@@ -1,14 +1,272 @@
 import osmnx as ox
 import networkx as nx
 import random
-import math
 import numpy as np
 import time
 import warnings
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+from numba import njit, prange, boolean, float32, float64, int32, int64
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra
 
 # Suppress warnings / Приховуємо попередження
 warnings.filterwarnings("ignore")
 
+# Disk cache (OSM responses + prepared graphs) / Дисковий кеш (відповіді OSM + підготовлені графи)
+CACHE_DIR = "cache"
+# Bump when the pickled layout changes / Збільшити при зміні формату кешу
+CACHE_FORMAT = 3
+ox.settings.use_cache = True
+
+# Share of swap moves next to 2-opt reversals / Частка ходів-обмінів поряд з 2-opt
+SWAP_MOVE_PROB = 0.1
+
+# Seed of the traffic-noise generator / Seed генератора шуму трафіку
+TRAFFIC_SEED = 42
+
+# Streamlit sessions run in separate threads; Numba's parallel backend is not
+# guaranteed to be re-entrant (workqueue aborts), so parallel SA runs one at a time
+# Сесії Streamlit працюють у різних потоках; паралельний SA запускається по одному
+_SA_LOCK = threading.Lock()
+
+# Typed kernel signatures: compiled at import, then loaded from cache / Сигнатури ядер: компіляція при імпорті, далі з кешу
+_SA_KERNEL_SIG = (float32[:, ::1], int64, int32[::1], float64, float64, int64, int64, int64)
+_SA_MULTISTART_SIG = (float32[:, ::1], int64, int32[::1], float64, float64, int64, int64, int64, int64, boolean)
+
+# Max convergence-history points per run / Макс. кількість точок історії за запуск
+HISTORY_POINTS = 500
+
+# All-pairs table is V x V float32 / Таблиця всіх пар має розмір V x V (float32)
+ALL_PAIRS_MAX_NODES = 2000
+
+
+@njit(cache=True)
+def _route_cost(dist, route):
+    """Route cost with depot at both ends / Вартість маршруту з депо на обох кінцях"""
+    # Accumulate in float64 over float32 entries / Накопичення у float64 над елементами float32
+    cost = 0.0
+    cost += dist[0, route[0]]
+    for k in range(route.shape[0] - 1):
+        cost += dist[route[k], route[k + 1]]
+    cost += dist[route[route.shape[0] - 1], 0]
+    return cost
+
+
+@njit(cache=True)
+def _end_edges(route, dist, depot_out, depot_in, i, j, n):
+    """
+    Edges entering position i and leaving position j, before and after a move
+    that exchanges the end points a = route[i], b = route[j].
+    Ребра на вході в позицію i та виході з позиції j до і після ходу, що міняє кінці a та b.
+    """
+    a = route[i]
+    b = route[j]
+    # Depot (index 0) closes the route: contiguous row/column vectors
+    # Депо (індекс 0) замикає маршрут: неперервні вектори рядка/стовпця
+    if i > 0:
+        prev_i = route[i - 1]
+        in_a = dist[prev_i, a]
+        in_b = dist[prev_i, b]
+    else:
+        in_a = depot_out[a]
+        in_b = depot_out[b]
+    if j < n - 1:
+        next_j = route[j + 1]
+        out_a = dist[a, next_j]
+        out_b = dist[b, next_j]
+    else:
+        out_a = depot_in[a]
+        out_b = depot_in[b]
+    return in_a, in_b, out_a, out_b
+
+
+@njit(cache=True)
+def _swap_delta(route, dist, depot_out, depot_in, i, j, n):
+    """
+    Cost change of swapping positions i < j in a route of length n (O(1)).
+    Зміна вартості при обміні позицій i < j у маршруті довжини n (O(1)).
+    """
+    a = route[i]
+    b = route[j]
+    in_a, in_b, out_a, out_b = _end_edges(route, dist, depot_out, depot_in, i, j, n)
+
+    if j == i + 1:
+        old = in_a + dist[a, b] + out_b
+        new = in_b + dist[b, a] + out_a
+    else:
+        next_i = route[i + 1]
+        prev_j = route[j - 1]
+        old = in_a + dist[a, next_i] + dist[prev_j, b] + out_b
+        new = in_b + dist[b, next_i] + dist[prev_j, a] + out_a
+    return new - old
+
+
+@njit(cache=True)
+def _update_prefix(route, dist, fwd_pre, bwd_pre):
+    """
+    Prefix sums of route edges in both directions (for O(1) reversal delta).
+    Префіксні суми ребер маршруту в обох напрямках (для O(1) дельти реверсу).
+    """
+    fwd_pre[0] = 0.0
+    bwd_pre[0] = 0.0
+    for k in range(route.shape[0] - 1):
+        fwd_pre[k + 1] = fwd_pre[k] + dist[route[k], route[k + 1]]
+        bwd_pre[k + 1] = bwd_pre[k] + dist[route[k + 1], route[k]]
+
+
+@njit(cache=True)
+def _reverse_delta(route, dist, depot_out, depot_in, fwd_pre, bwd_pre, i, j, n):
+    """
+    Cost change of reversing route[i..j] in a route of length n (O(1)).
+    Зміна вартості при реверсі route[i..j] у маршруті довжини n (O(1)).
+    """
+    in_a, in_b, out_a, out_b = _end_edges(route, dist, depot_out, depot_in, i, j, n)
+
+    # Matrix is asymmetric: inner edges flip direction / Матриця несиметрична: внутрішні ребра змінюють напрямок
+    old = in_a + (fwd_pre[j] - fwd_pre[i]) + out_b
+    new = in_b + (bwd_pre[j] - bwd_pre[i]) + out_a
+    return new - old
+
+
+@njit(_SA_KERNEL_SIG, cache=True, fastmath=True)
+def _sa_kernel(dist, n, initial_route, initial_temp, cooling_rate, max_iter, seed, stride):
+    """
+    Compiled Simulated Annealing loop. Returns best route, its cost, history
+    (every stride-th iteration plus the last one) and the number of iterations.
+    Скомпільований цикл симульованого відпалу. Повертає найкращий маршрут, вартість,
+    історію (кожна stride-та ітерація та остання) і кількість ітерацій.
+    """
+    np.random.seed(seed)
+    size = n - 1
+
+    # Preallocated buffers, mutated in place / Попередньо виділені буфери, змінюються на місці
+    current_route = initial_route.copy()
+    current_cost = _route_cost(dist, current_route)
+    best_route = current_route.copy()
+    best_cost = current_cost
+    temp = initial_temp
+    history = np.empty(max_iter // stride + 2, dtype=np.float64)
+    points = 0
+    steps = 0
+    # -log(U) draws: u < exp(-delta/T) <=> -log(u) * T > delta / Вибірки -log(U) замість exp
+    neg_log_u = np.random.exponential(1.0, max_iter)
+
+    # Depot row/column as contiguous vectors / Рядок і стовпець депо як неперервні вектори
+    depot_out = np.ascontiguousarray(dist[0])
+    depot_in = np.ascontiguousarray(dist[:, 0])
+
+    fwd_pre = np.empty(max(size, 1), dtype=np.float64)
+    bwd_pre = np.empty(max(size, 1), dtype=np.float64)
+    _update_prefix(current_route, dist, fwd_pre, bwd_pre)
+
+    for i in range(max_iter):
+        if size < 2: break
+
+        # Two distinct sorted indices / Два різні відсортовані індекси
+        idx1 = np.random.randint(0, size)
+        idx2 = np.random.randint(0, size - 1)
+        if idx2 >= idx1:
+            idx2 += 1
+        if idx1 > idx2:
+            idx1, idx2 = idx2, idx1
+
+        # 2-opt reversal, occasionally a swap / Реверс 2-opt, іноді обмін
+        is_swap = np.random.random() < SWAP_MOVE_PROB
+        if is_swap:
+            delta = _swap_delta(current_route, dist, depot_out, depot_in, idx1, idx2, size)
+        else:
+            delta = _reverse_delta(
+                current_route, dist, depot_out, depot_in, fwd_pre, bwd_pre, idx1, idx2, size
+            )
+
+        # Acceptance Probability
+        if delta <= 0.0 or neg_log_u[i] * temp >= delta:
+            if is_swap:
+                current_route[idx1], current_route[idx2] = current_route[idx2], current_route[idx1]
+            else:
+                lo, hi = idx1, idx2
+                while lo < hi:
+                    current_route[lo], current_route[hi] = current_route[hi], current_route[lo]
+                    lo += 1
+                    hi -= 1
+            _update_prefix(current_route, dist, fwd_pre, bwd_pre)
+            current_cost += delta
+            if current_cost < best_cost:
+                best_cost = current_cost
+                best_route[:] = current_route
+
+        if i % stride == 0:
+            history[points] = best_cost
+            points += 1
+        steps += 1
+        temp *= cooling_rate
+        if temp < 1: break
+
+    # Always end on the final best cost / Історія завжди закінчується фінальною вартістю
+    if steps > 0 and (steps - 1) % stride != 0:
+        history[points] = best_cost
+        points += 1
+
+    # Exact cost, free of accumulated rounding / Точна вартість без накопиченої похибки
+    return best_route, _route_cost(dist, best_route), history[:points], steps
+
+
+@njit(_SA_MULTISTART_SIG, cache=True, parallel=True)
+def _sa_multistart(dist, n, initial_route, initial_temp, cooling_rate, max_iter, seed, num_chains, stride,
+                   shuffle):
+    """
+    Independent SA chains in parallel, best one wins. With shuffle, every chain
+    starts from its own random permutation of initial_route.
+    Незалежні ланцюги відпалу паралельно, перемагає найкращий. З shuffle кожен
+    ланцюг стартує з власної випадкової перестановки initial_route.
+    """
+    routes = np.empty((num_chains, initial_route.shape[0]), dtype=initial_route.dtype)
+    costs = np.empty(num_chains, dtype=np.float64)
+    histories = np.empty((num_chains, max_iter // stride + 2), dtype=np.float64)
+    points = np.empty(num_chains, dtype=np.int64)
+    steps = np.empty(num_chains, dtype=np.int64)
+
+    for k in prange(num_chains):
+        # Per-chain seed, RNG state is per thread / Окремий seed, стан RNG свій для кожного потоку
+        np.random.seed(seed + k)
+        start = initial_route.copy()
+        if shuffle:
+            np.random.shuffle(start)
+        # Separate stream for the annealing itself / Окремий потік для самого відпалу
+        route, cost, history, chain_steps = _sa_kernel(
+            dist, n, start, initial_temp, cooling_rate, max_iter, seed + num_chains + k, stride
+        )
+        routes[k] = route
+        costs[k] = cost
+        histories[k, :history.shape[0]] = history
+        points[k] = history.shape[0]
+        steps[k] = chain_steps
+
+    best = np.argmin(costs)
+    return routes[best].copy(), costs[best], histories[best, :points[best]].copy(), steps[best]
+
+
+def _write_atomic(path, write):
+    """
+    Writes a cache file via a temp file + os.replace, so readers never see a partial file.
+    Запис файлу кешу через тимчасовий файл + os.replace, щоб не було частково записаних файлів.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 class UrbanDeliveryOptimizer:
     def __init__(self, place_name, num_orders=10):
         """
@@ -24,21 +282,48 @@ class UrbanDeliveryOptimizer:
             '["motor_vehicle"!~"no"]'
         )
 
-        # 1. Load Graph / Завантаження графа
-        self.G = ox.graph_from_place(place_name, network_type='drive', custom_filter=strict_filter)
-        
-        # 2. Filter isolated nodes / Фільтрація ізольованих вузлів
-        largest_cc = max(nx.strongly_connected_components(self.G), key=len)
-        self.G = self.G.subgraph(largest_cc).copy()
-        
-        # 3. Project to meters (for calculations) / Проекція в метри (для розрахунків)
-        # We keep self.G (lat/lon) for markers and self.G_proj (meters) for distances
-        try:
-            self.G_proj = ox.project_graph(self.G)
-        except AttributeError:
-            self.G_proj = ox.projection.project_graph(self.G)
+        key = hashlib.sha1(f"v{CACHE_FORMAT}:{place_name}{strict_filter}".encode()).hexdigest()
+        cache_path = os.path.join(CACHE_DIR, f"{key}.pkl")
+        self._cache_key = key
+
+        self.G = None
+        # Projected (metric) graph, built only on demand / Проектований граф, будується лише за потреби
+        self._G_proj = None
+        if os.path.exists(cache_path):
+            # Prepared graph from disk / Підготовлений граф з диска
+            try:
+                with open(cache_path, "rb") as f:
+                    self.G, self.nodes = pickle.load(f)
+            except Exception:
+                # Damaged or incompatible cache (e.g. other networkx/osmnx): rebuild it
+                # Пошкоджений або несумісний кеш (напр. інша версія networkx/osmnx): будуємо заново
+                self.G = None
+
+        if self.G is None:
+            # 1. Load Graph / Завантаження графа
+            self.G = ox.graph_from_place(place_name, network_type='drive', custom_filter=strict_filter)
         
-        self.nodes = list(self.G_proj.nodes())
+            # 2. Filter isolated nodes / Фільтрація ізольованих вузлів
+            largest_cc = max(nx.strongly_connected_components(self.G), key=len)
+            self.G = self.G.subgraph(largest_cc).copy()
+            self._strip_attributes(self.G)
+
+            # 3. No projection needed: osmnx edge 'length' is already in meters,
+            # so self.G (lat/lon) serves both markers and distances
+            # Проекція не потрібна: 'length' ребер osmnx вже в метрах
+            self.nodes = list(self.G.nodes())
+
+            _write_atomic(
+                cache_path,
+                lambda f: pickle.dump((self.G, self.nodes), f, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+
+        # CSR adjacency, built once and reused / CSR-матриця суміжності, будується один раз
+        self._node2idx = {n: i for i, n in enumerate(self.nodes)}
+        self._csr = self._build_csr()
+        # Transposed for "to node" distances / Транспонована для відстаней "до вузла"
+        self._csr_rev = self._csr.T.tocsr()
+        self._all_pairs = None
         
         if len(self.nodes) < num_orders + 1:
             raise ValueError("Not enough nodes for this number of orders!")
@@ -52,77 +337,193 @@ class UrbanDeliveryOptimizer:
         self.num_targets = len(self.targets)
         
         # Matrix Cache / Кеш матриці
-        self.dist_matrix = np.zeros((self.num_targets, self.num_targets))
+        self.dist_matrix = np.zeros((self.num_targets, self.num_targets), dtype=np.float32)
+        # Traffic noise generator / Генератор шуму трафіку
+        self._traffic_rng = np.random.default_rng(TRAFFIC_SEED)
+        # Targets the matrix was built for / Цілі, для яких побудовано матрицю
+        self._matrix_fingerprint = None
+        # Overlay on targets: (u, v) -> road nodes of the shortest path / Оверлей на цілях: шляхи між цілями
+        self._paths = {}
+        # Polyline Cache: (u, v) -> [[lat, lon], ...] / Кеш ліній маршруту
+        self._pair_coords = {}
+        # Last SA run: iterations and history sampling step / Останній запуск: ітерації та крок історії
+        self.last_iterations = 0
+        self.history_stride = 1
         print(f"[BACKEND] Ready. Nodes: {len(self.nodes)}")
 
+    @staticmethod
+    def _strip_attributes(G):
+        """
+        Keeps only attributes used later: node x/y, edge length/geometry.
+        Залишає лише потрібні атрибути: x/y вузлів, length/geometry ребер.
+        """
+        for _, data in G.nodes(data=True):
+            x, y = data['x'], data['y']
+            data.clear()
+            data.update(x=x, y=y)
+        for _, _, data in G.edges(data=True):
+            keep = {k: data[k] for k in ('length', 'geometry') if k in data}
+            data.clear()
+            data.update(keep)
+
+    @property
+    def G_proj(self):
+        """
+        Graph projected to meters, computed on first access.
+        Граф, спроектований у метри, обчислюється при першому зверненні.
+        """
+        if self._G_proj is None:
+            G_min = self._minimal_graph(self.G)
+            try:
+                self._G_proj = ox.project_graph(G_min)
+            except AttributeError:
+                self._G_proj = ox.projection.project_graph(G_min)
+        return self._G_proj
+
+    @staticmethod
+    def _minimal_graph(G):
+        """
+        Copy with node x/y and edge length only, cheap to project.
+        Копія лише з x/y вузлів та length ребер, дешева для проекції.
+        """
+        G_min = nx.MultiDiGraph(**G.graph)
+        G_min.add_nodes_from((n, {'x': d['x'], 'y': d['y']}) for n, d in G.nodes(data=True))
+        G_min.add_edges_from(
+            (u, v, k, {'length': d['length']})
+            for u, v, k, d in G.edges(keys=True, data=True) if 'length' in d
+        )
+        return G_min
+
     def precalculate_distances(self):
         """Calculates distance matrix / Розрахунок матриці відстаней"""
-        for i in range(self.num_targets):
-            for j in range(self.num_targets):
-                if i != j:
-                    try:
-                        # Use projected graph (meters) / Використовуємо проектований граф (метри)
-                        length = nx.shortest_path_length(
-                            self.G_proj, self.targets[i], self.targets[j], weight='length'
-                        )
-                        # Traffic noise / Шум трафіку
-                        traffic_factor = random.uniform(1.0, 1.2)
-                        self.dist_matrix[i][j] = length * traffic_factor
-                    except nx.NetworkXNoPath:
-                        self.dist_matrix[i][j] = 1e9
+        if self._all_pairs is None:
+            self._all_pairs = self._load_all_pairs()
+
+        if self._all_pairs is not None:
+            # Table lookup / Вибірка з таблиці
+            idx = [self._node2idx[t] for t in self.targets]
+            self.dist_matrix[:] = self._all_pairs[np.ix_(idx, idx)]
+        else:
+            # Multi-source Dijkstra in one C call / Багатоджерельний Дейкстра одним викликом C
+            idx = [self._node2idx[t] for t in self.targets]
+            dist_rows, pred_rows = dijkstra(self._csr, indices=idx, return_predecessors=True)
+            for source, predecessors in zip(self.targets, pred_rows):
+                self._store_paths(source, predecessors)
+            self.dist_matrix[:] = np.where(np.isinf(dist_rows[:, idx]), 1e9, dist_rows[:, idx])
+
+        # Traffic noise / Шум трафіку
+        traffic_factor = self._traffic_rng.uniform(1.0, 1.2, (self.num_targets, self.num_targets))
+        unreachable = self.dist_matrix >= 1e9
+        self.dist_matrix *= traffic_factor
+        self.dist_matrix[unreachable] = 1e9
+        self._matrix_fingerprint = self._targets_fingerprint()
+
+    def _targets_fingerprint(self):
+        """Hash of the current targets / Хеш поточних цілей"""
+        return hashlib.sha1(pickle.dumps(self.targets)).hexdigest()
+
+    def ensure_distances(self):
+        """
+        Recalculates the matrix only if targets changed since the last build.
+        Перераховує матрицю лише якщо цілі змінилися з моменту останньої побудови.
+        """
+        if self._matrix_fingerprint != self._targets_fingerprint():
+            self.precalculate_distances()
+
+    def _build_csr(self):
+        """
+        CSR adjacency of G (edge length in meters) in self.nodes order (shortest of parallel edges).
+        CSR-матриця суміжності G (довжини в метрах) у порядку self.nodes (найкоротше з паралельних ребер).
+        """
+        best = {}
+        for u, v, length in self.G.edges(data='length'):
+            if u == v or length is None:
+                continue
+            key = (self._node2idx[u], self._node2idx[v])
+            if key not in best or length < best[key]:
+                best[key] = length
+
+        num_nodes = len(self.nodes)
+        if not best:
+            return csr_array((num_nodes, num_nodes), dtype=np.float64)
+        rows, cols = zip(*best.keys())
+        csr = csr_array(
+            (np.fromiter(best.values(), dtype=np.float64), (np.array(rows), np.array(cols))),
+            shape=(num_nodes, num_nodes),
+        )
+        # Canonical layout, so the CSR can be hashed / Канонічний вигляд, щоб CSR можна було хешувати
+        csr.sort_indices()
+        return csr
+
+    def _load_all_pairs(self):
+        """
+        All-pairs road distances over self.nodes, cached on disk (None for large graphs).
+        Відстані між усіма парами вузлів, кешовані на диску (None для великих графів).
+        """
+        num_nodes = len(self.nodes)
+        if num_nodes > ALL_PAIRS_MAX_NODES:
+            return None
+
+        # Key on node order and edges the table was built from / Ключ за порядком вузлів та ребрами графа
+        graph_hash = hashlib.sha1(pickle.dumps(self.nodes))
+        for part in (self._csr.data, self._csr.indices, self._csr.indptr):
+            graph_hash.update(np.ascontiguousarray(part).tobytes())
+        graph_key = graph_hash.hexdigest()[:16]
+        path = os.path.join(CACHE_DIR, f"{self._cache_key}_{graph_key}_dist.npy")
+        if os.path.exists(path):
+            try:
+                table = np.load(path)
+                if table.shape == (num_nodes, num_nodes):
+                    return table
+            except (ValueError, OSError, EOFError):
+                # Damaged cache: recompute / Пошкоджений кеш: рахуємо заново
+                pass
+
+        table = dijkstra(self._csr).astype(np.float32)
+        table[np.isinf(table)] = 1e9
+
+        _write_atomic(path, lambda f: np.save(f, table))
+        return table
 
     def total_route_cost(self, route_indices):
         """Calculate total cost / Розрахунок повної вартості"""
-        cost = 0
-        cost += self.dist_matrix[0][route_indices[0]]
-        for i in range(len(route_indices) - 1):
-            cost += self.dist_matrix[route_indices[i]][route_indices[i+1]]
-        cost += self.dist_matrix[route_indices[-1]][0]
-        return cost
-
-    def simulated_annealing(self, initial_route=None, initial_temp=1000, final_temp=0.1, max_iter=None):
-        """Simulated Annealing Algorithm / Алгоритм симульованого відпалу"""
+        # Single gather + reduction (see _route_cost for the JIT twin) / Одна вибірка + редукція
+        idx = np.asarray(route_indices, dtype=np.intp)
+        return float(self.dist_matrix[np.concatenate(([0], idx)), np.concatenate((idx, [0]))].sum(dtype=np.float64))
+
+    def simulated_annealing(self, initial_route=None, initial_temp=1000, final_temp=0.1, max_iter=None,
+                            num_chains=1):
+        """
+        Simulated Annealing Algorithm (best of num_chains parallel runs).
+        Алгоритм симульованого відпалу (найкращий з num_chains паралельних запусків).
+        """
         
         if max_iter is None:
             max_iter = 1000 + (self.num_targets * 300)  
 
         cooling_rate = (final_temp / initial_temp) ** (1 / max_iter)
 
-        if initial_route is None:
-            current_route = list(range(1, self.num_targets))
-            random.shuffle(current_route)
+        # Typed arrays for the compiled kernel / Типізовані масиви для скомпільованого ядра
+        # Cold start: each chain shuffles its own route / Холодний старт: кожен ланцюг перемішує свій маршрут
+        shuffle = initial_route is None
+        if shuffle:
+            route = np.arange(1, self.num_targets, dtype=np.int32)
         else:
-            current_route = initial_route[:]
-        
-        current_cost = self.total_route_cost(current_route)
-        best_route = current_route[:]
-        best_cost = current_cost
-        temp = initial_temp
-        history = []
-        
-        for i in range(max_iter):
-            new_route = current_route[:]
-            if len(new_route) < 2: break
-            
-            # Swap Logic
-            idx1, idx2 = sorted(random.sample(range(len(new_route)), 2))
-            new_route[idx1:idx2+1] = reversed(new_route[idx1:idx2+1])
-            new_cost = self.total_route_cost(new_route)
-            
-            # Acceptance Probability
-            delta = new_cost - current_cost
-            if delta < 0 or random.random() < math.exp(-delta / temp):
-                current_route = new_route
-                current_cost = new_cost
-                if current_cost < best_cost:
-                    best_cost = current_cost
-                    best_route = current_route[:]
-                    
-            history.append(best_cost)
-            temp *= cooling_rate
-            if temp < 1: break
-            
-        return best_route, best_cost, history
+            route = np.array(initial_route, dtype=np.int32)
+
+        dist = np.ascontiguousarray(self.dist_matrix, dtype=np.float32)
+        seed = random.randrange(2**31)
+        # Decimated history for the UI / Проріджена історія для інтерфейсу
+        stride = max(1, max_iter // HISTORY_POINTS)
+
+        with _SA_LOCK:
+            best_route, best_cost, history, steps = _sa_multistart(
+                dist, self.num_targets, route, float(initial_temp), cooling_rate, max_iter, seed, num_chains, stride,
+                shuffle
+            )
+        self.history_stride = stride
+        self.last_iterations = int(steps)
+        return best_route.tolist(), float(best_cost), history.tolist()
 
     def add_dynamic_order(self):
         """Adds a new order dynamically / Динамічне додавання замовлення"""
@@ -130,31 +531,45 @@ class UrbanDeliveryOptimizer:
         if not available: return None
         
         new_node = random.choice(available)
+        # Incremental extension keeps a current matrix current / Розширення зберігає актуальність матриці
+        is_current = self._matrix_fingerprint == self._targets_fingerprint()
         self.orders.append(new_node)
         self.targets.append(new_node)
         
         old_size = self.num_targets
         self.num_targets += 1
-        new_matrix = np.zeros((self.num_targets, self.num_targets))
+        new_matrix = np.zeros((self.num_targets, self.num_targets), dtype=np.float32)
         new_matrix[:old_size, :old_size] = self.dist_matrix
         
         new_idx = old_size
-        for i in range(self.num_targets):
-            if i != new_idx:
-                try:
-                    d1 = nx.shortest_path_length(self.G_proj, self.targets[i], self.targets[new_idx], weight='length')
-                    d2 = nx.shortest_path_length(self.G_proj, self.targets[new_idx], self.targets[i], weight='length')
-
-                    noise1 = random.uniform(1.0, 1.2)
-                    noise2 = random.uniform(1.0, 1.2)
-                    
-                    new_matrix[i][new_idx] = d1 * noise1
-                    new_matrix[new_idx][i] = d2 * noise2
-                except nx.NetworkXNoPath: 
-                    new_matrix[i][new_idx] = 1e9
-                    new_matrix[new_idx][i] = 1e9
-                    
+        new_pos = self._node2idx[new_node]
+        idx = [self._node2idx[t] for t in self.targets[:old_size]]
+        if self._all_pairs is not None:
+            d_from = self._all_pairs[new_pos, idx]
+            d_to = self._all_pairs[idx, new_pos]
+        else:
+            # Two traversals instead of 2n / Два обходи замість 2n
+            fwd, fwd_pred = dijkstra(self._csr, indices=new_pos, return_predecessors=True)
+            rev, rev_pred = dijkstra(self._csr_rev, indices=new_pos, return_predecessors=True)
+            self._store_paths(new_node, fwd_pred)
+            for t in self.targets[:old_size]:
+                path = self._walk_path(rev_pred, new_pos, self._node2idx[t])
+                if path is not None:
+                    # Reversed-graph path read backwards / Шлях оберненого графа у зворотному порядку
+                    self._paths[(t, new_node)] = path[::-1]
+
+            d_from = np.where(np.isinf(fwd[idx]), 1e9, fwd[idx])
+            d_to = np.where(np.isinf(rev[idx]), 1e9, rev[idx])
+
+        noise1 = self._traffic_rng.uniform(1.0, 1.2, old_size)
+        noise2 = self._traffic_rng.uniform(1.0, 1.2, old_size)
+
+        new_matrix[:old_size, new_idx] = np.where(d_to < 1e9, d_to * noise1, 1e9)
+        new_matrix[new_idx, :old_size] = np.where(d_from < 1e9, d_from * noise2, 1e9)
+
         self.dist_matrix = new_matrix
+        if is_current:
+            self._matrix_fingerprint = self._targets_fingerprint()
         return new_idx
 
     def get_route_coordinates(self, route_indices):
@@ -166,37 +581,69 @@ class UrbanDeliveryOptimizer:
         coordinates = []
         
         for i in range(len(full_indices) - 1):
-            u = self.targets[full_indices[i]]
-            v = self.targets[full_indices[i+1]]
-            
-            try:
-                path_nodes = nx.shortest_path(self.G_proj, u, v, weight='length')
+            key = (self.targets[full_indices[i]], self.targets[full_indices[i+1]])
+            if key not in self._pair_coords:
+                self._pair_coords[key] = self._path_coordinates(*key)
+            coordinates.extend(self._pair_coords[key])
                 
-                # Проходимося по кожному відрізку (вулиці)
-                for k in range(len(path_nodes) - 1):
-                    n1 = path_nodes[k]
-                    n2 = path_nodes[k+1]
-                    
-                    edges = self.G.get_edge_data(n1, n2)
-                    if not edges: continue
-                    
-                    # Вибираємо найкоротший сегмент
-                    valid_edges = [d for d in edges.values() if 'length' in d]
-                    if valid_edges:
-                        min_edge = min(valid_edges, key=lambda d: d['length'])
-                    else:
-                        min_edge = list(edges.values())[0]
-                        
-                    if 'geometry' in min_edge:
-                        for lon, lat in min_edge['geometry'].coords:
-                            coordinates.append([lat, lon])
-                    else:
-                        coordinates.append([self.G.nodes[n1]['y'], self.G.nodes[n1]['x']])
-                        coordinates.append([self.G.nodes[n2]['y'], self.G.nodes[n2]['x']])
-                        
-            except nx.NetworkXNoPath:
-                pass
+        return coordinates
+
+    def _walk_path(self, predecessors, src, dst):
+        """
+        Road nodes of the src -> dst path from a csgraph predecessor row (None if unreachable).
+        Вузли шляху src -> dst з рядка попередників csgraph (None, якщо недосяжно).
+        """
+        path = [dst]
+        k = dst
+        while k != src:
+            k = predecessors[k]
+            if k < 0:
+                return None
+            path.append(k)
+        return [self.nodes[k] for k in reversed(path)]
+
+    def _store_paths(self, source, predecessors):
+        """Keeps source -> target paths for the overlay / Зберігає шляхи джерело -> ціль для оверлею"""
+        src = self._node2idx[source]
+        for target in self.targets:
+            if target != source:
+                path = self._walk_path(predecessors, src, self._node2idx[target])
+                if path is not None:
+                    self._paths[(source, target)] = path
+
+    def _path_coordinates(self, u, v):
+        """Street geometry of the shortest u -> v path / Геометрія вулиць найкоротшого шляху u -> v"""
+        coordinates = []
+        if (u, v) not in self._paths:
+            # One pass fills all paths from u / Один прохід заповнює всі шляхи з u
+            _, predecessors = dijkstra(self._csr, indices=self._node2idx[u], return_predecessors=True)
+            self._store_paths(u, predecessors)
+        path_nodes = self._paths.get((u, v))
+        if path_nodes is None:
+            return coordinates
+
+        # Проходимося по кожному відрізку (вулиці)
+        for k in range(len(path_nodes) - 1):
+            n1 = path_nodes[k]
+            n2 = path_nodes[k+1]
+            
+            edges = self.G.get_edge_data(n1, n2)
+            if not edges: continue
+            
+            # Вибираємо найкоротший сегмент
+            valid_edges = [d for d in edges.values() if 'length' in d]
+            if valid_edges:
+                min_edge = min(valid_edges, key=lambda d: d['length'])
+            else:
+                min_edge = list(edges.values())[0]
                 
+            if 'geometry' in min_edge:
+                for lon, lat in min_edge['geometry'].coords:
+                    coordinates.append([lat, lon])
+            else:
+                coordinates.append([self.G.nodes[n1]['y'], self.G.nodes[n1]['x']])
+                coordinates.append([self.G.nodes[n2]['y'], self.G.nodes[n2]['x']])
+
         return coordinates
     
     def get_markers(self):